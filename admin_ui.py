@@ -1,13 +1,125 @@
 import streamlit as st
 import requests
 import json
-from datetime import datetime
-from typing import List, Dict, Any
+import uuid
+from datetime import datetime, timezone
+from time import time_ns
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import quote
 import pandas as pd
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from config import Config
+
 # Configuration
 API_BASE_URL = "http://localhost:8000"
 
+# Default (connect, read) timeout so a hung backend doesn't freeze reruns
+REQUEST_TIMEOUT = (3, 10)
+
+# Memories rendered per page in the list views
+PAGE_SIZE = 25
+
+# Cached tzinfo so hot paths skip per-call timezone construction
+_UTC = timezone.utc
+
+def utcnow_iso() -> str:
+    """Current UTC time as an ISO-8601 string"""
+    return datetime.fromtimestamp(time_ns() / 1e9, _UTC).isoformat()
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Get a pooled HTTP session shared across Streamlit reruns"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=20,
+        max_retries=3
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_health() -> Dict[str, Any]:
+    """Fetch service health, cached across reruns for the TTL window"""
+    response = get_session().get(f"{API_BASE_URL}/health/db", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def post_json(url: str, payload: Dict[str, Any]) -> requests.Response:
+    """POST a JSON payload, serializing with orjson when available"""
+    if orjson is not None:
+        return get_session().post(
+            url,
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=REQUEST_TIMEOUT
+        )
+    return get_session().post(url, json=payload, timeout=REQUEST_TIMEOUT)
+
+def parse_json(response: requests.Response) -> Any:
+    """Decode a JSON response body, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+def _fetch_list_streaming(url: str) -> List[Dict[str, Any]]:
+    """GET a JSON array, decoding incrementally to avoid a second full copy"""
+    response = get_session().get(url, stream=True, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    if ijson is not None:
+        response.raw.decode_content = True
+        return list(ijson.items(response.raw, "item"))
+    return response.json()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_buffered(after: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+    """Fetch one page of buffered memories, cached for the TTL window
+    
+    `after` is the (buffered_at, id) cursor from the last row of the
+    previous page; the backend then seeks through its compound index
+    instead of skipping rows.
+    """
+    url = f"{API_BASE_URL}/buffer?limit={PAGE_SIZE}"
+    if after is not None:
+        url += f"&after_ts={quote(after[0])}&after_id={after[1]}"
+    return _fetch_list_streaming(url)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_stored() -> List[Dict[str, Any]]:
+    """Fetch stored memories, cached across reruns for the TTL window"""
+    return _fetch_list_streaming(f"{API_BASE_URL}/memories")
+
+@st.cache_data(ttl=30, show_spinner=False)
+def stored_memories_frame() -> pd.DataFrame:
+    """Flatten stored memories into a DataFrame for vectorized filtering"""
+    stored_memories = fetch_stored()
+    return pd.DataFrame({
+        "memory_type": pd.Categorical(
+            [m['candidate']['memory_type'] for m in stored_memories],
+            categories=Config.MEMORY_TYPE_ORDER
+        ),
+        "content_lower": [m['candidate']['content'].lower() for m in stored_memories],
+        "record": stored_memories
+    })
+
+def clear_fetch_caches():
+    """Invalidate all cached backend responses"""
+    fetch_health.clear()
+    fetch_buffered.clear()
+    fetch_stored.clear()
+    stored_memories_frame.clear()
+
 def main():
     st.set_page_config(
         page_title="Decider Admin UI",
@@ -40,55 +152,51 @@ def show_dashboard():
     st.header("System Overview")
     
     try:
-        # Get system statistics
-        health_response = requests.get(f"{API_BASE_URL}/health/db")
-        if health_response.status_code == 200:
-            health_data = health_response.json()
-            
-            # Display health status
+        # Get system statistics (cached across reruns)
+        health_data = fetch_health()
+
+        # Display health status
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            status_color = "🟢" if health_data["status"] == "healthy" else "🔴"
+            st.metric("Service Status", f"{status_color} {health_data['status']}")
+
+        with col2:
+            db_status = health_data.get("database", "unknown")
+            db_color = "🟢" if db_status == "connected" else "🔴"
+            st.metric("Database", f"{db_color} {db_status}")
+
+        with col3:
+            st.metric("Timestamp", health_data.get("timestamp", "unknown"))
+
+        # Get collection counts
+        if "collections" in health_data:
+            collections = health_data["collections"]
+
+            st.subheader("Collection Statistics")
             col1, col2, col3 = st.columns(3)
-            
+
             with col1:
-                status_color = "🟢" if health_data["status"] == "healthy" else "🔴"
-                st.metric("Service Status", f"{status_color} {health_data['status']}")
-            
+                st.metric("Stored Memories", collections.get("stored_memories", 0))
+
             with col2:
-                db_status = health_data.get("database", "unknown")
-                db_color = "🟢" if db_status == "connected" else "🔴"
-                st.metric("Database", f"{db_color} {db_status}")
-            
+                st.metric("Buffered Memories", collections.get("buffered_memories", 0))
+
             with col3:
-                st.metric("Timestamp", health_data.get("timestamp", "unknown"))
-            
-            # Get collection counts
-            if "collections" in health_data:
-                collections = health_data["collections"]
-                
-                st.subheader("Collection Statistics")
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric("Stored Memories", collections.get("stored_memories", 0))
-                
-                with col2:
-                    st.metric("Buffered Memories", collections.get("buffered_memories", 0))
-                
-                with col3:
-                    st.metric("Audit Logs", collections.get("audit_logs", 0))
-        
-        else:
-            st.error("Failed to get system health information")
-            
+                st.metric("Audit Logs", collections.get("audit_logs", 0))
+
     except Exception as e:
         st.error(f"Error connecting to service: {e}")
-    
+
     # Quick actions
     st.subheader("Quick Actions")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         if st.button("Refresh System Status"):
+            clear_fetch_caches()
             st.rerun()
     
     with col2:
@@ -122,11 +230,11 @@ def show_live_input():
         st.write("**Quick Actions**")
         if st.button("➕ Add Turn", key="add_turn"):
             if conversation_text.strip():
-                from datetime import datetime, timezone
                 new_turn = {
+                    "_id": uuid.uuid4().hex,
                     "speaker": speaker,
                     "text": conversation_text.strip(),
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "timestamp": utcnow_iso(),
                     "metadata": {"live_input": True}
                 }
                 st.session_state.conversation_history.append(new_turn)
@@ -145,15 +253,18 @@ def show_live_input():
     if st.session_state.conversation_history:
         st.subheader("📝 Conversation History")
         
-        for i, turn in enumerate(st.session_state.conversation_history):
+        for turn in st.session_state.conversation_history:
             col1, col2, col3 = st.columns([1, 3, 1])
             with col1:
                 st.write(f"**{turn['speaker']}**")
             with col2:
                 st.write(turn['text'])
             with col3:
-                if st.button(f"❌", key=f"remove_{i}"):
-                    st.session_state.conversation_history.pop(i)
+                if st.button(f"❌", key=f"remove_{turn['_id']}"):
+                    st.session_state.conversation_history = [
+                        t for t in st.session_state.conversation_history
+                        if t['_id'] != turn['_id']
+                    ]
                     st.success("Turn removed!")
                     st.rerun()
         
@@ -241,17 +352,20 @@ def process_conversation():
     try:
         # Prepare the request payload
         payload = {
-            "turns": st.session_state.conversation_history,
+            "turns": [
+                {k: v for k, v in turn.items() if k != "_id"}
+                for turn in st.session_state.conversation_history
+            ],
             "user_id": "demo_user",
-            "session_id": f"live_session_{int(datetime.now().timestamp())}",
-            "context": {"live_demo": True, "timestamp": datetime.now().isoformat()}
+            "session_id": f"live_session_{time_ns() // 1_000_000_000}",
+            "context": {"live_demo": True, "timestamp": utcnow_iso()}
         }
         
         # Send to the service
-        response = requests.post(f"{API_BASE_URL}/extract_and_store", json=payload)
+        response = post_json(f"{API_BASE_URL}/extract_and_store", payload)
         
         if response.status_code == 200:
-            result = response.json()
+            result = parse_json(response)
             st.session_state.processing_results = result
             
             # Show success message
@@ -274,121 +388,157 @@ def show_buffered_memories():
     st.markdown("Review memories that need manual approval or rejection.")
     
     try:
-        # Get buffered memories
-        response = requests.get(f"{API_BASE_URL}/buffer")
-        if response.status_code == 200:
-            buffered_memories = response.json()
-            
-            if not buffered_memories:
-                st.info("No buffered memories to review.")
-                return
-            
-            # Display memories in a table
-            st.subheader(f"{len(buffered_memories)} Memories Pending Review")
-            
-            for i, memory in enumerate(buffered_memories):
-                with st.expander(f"Memory {i+1}: {memory['candidate']['content'][:100]}..."):
-                    col1, col2 = st.columns([2, 1])
-                    
-                    with col1:
-                        st.write(f"**Type:** {memory['candidate']['memory_type']}")
-                        st.write(f"**Content:** {memory['candidate']['content']}")
-                        st.write(f"**Salience Score:** {memory['candidate']['salience_score']:.3f}")
-                        st.write(f"**Buffer Reason:** {memory['buffer_reason']}")
-                        st.write(f"**Evidence:** {memory['candidate']['extraction_evidence']}")
-                        st.write(f"**Buffered:** {memory['buffered_at']}")
-                    
-                    with col2:
-                        st.write(f"**Confidence:** {memory['candidate']['confidence']:.3f}")
-                        st.write(f"**Relevance:** {memory['candidate']['relevance']:.3f}")
-                        st.write(f"**Specificity:** {memory['candidate']['specificity']:.3f}")
-                        st.write(f"**Buffer Score:** {memory['buffer_score']:.3f}")
-                        
-                        # Action buttons
-                        st.write("**Actions:**")
-                        
-                        # Approve button
-                        if st.button(f"Approve", key=f"approve_{i}"):
-                            approve_memory(memory['id'])
-                            st.success("Memory approved!")
-                            st.rerun()
-                        
-                        # Reject button
-                        if st.button(f"Reject", key=f"reject_{i}"):
-                            reject_memory(memory['id'])
-                            st.success("Memory rejected!")
-                            st.rerun()
-                        
-                        # Notes input
-                        notes = st.text_area("Admin Notes", key=f"notes_{i}")
-                        if notes:
-                            st.write(f"**Notes:** {notes}")
-        
-        else:
-            st.error("Failed to retrieve buffered memories")
-            
+        # Keyset pagination: each page is fetched with the cursor from
+        # the last row of the page before it, so navigation is
+        # previous/next rather than jump-to-page
+        cursors = st.session_state.setdefault("buffer_cursors", [None])
+        page_idx = min(st.session_state.get("buffer_page_idx", 0), len(cursors) - 1)
+        buffered_memories = fetch_buffered(cursors[page_idx])
+
+        if not buffered_memories and page_idx == 0:
+            st.info("No buffered memories to review.")
+            return
+
+        st.subheader(f"Page {page_idx + 1}: {len(buffered_memories)} Memories Pending Review")
+
+        nav_prev, nav_next = st.columns(2)
+        with nav_prev:
+            if st.button("Previous page", disabled=page_idx == 0, key="buffer_prev"):
+                st.session_state.buffer_page_idx = page_idx - 1
+                st.rerun()
+        with nav_next:
+            if st.button("Next page", disabled=len(buffered_memories) < PAGE_SIZE, key="buffer_next"):
+                last = buffered_memories[-1]
+                next_cursor = (last['buffered_at'], last['id'])
+                if page_idx + 1 < len(cursors):
+                    cursors[page_idx + 1] = next_cursor
+                else:
+                    cursors.append(next_cursor)
+                st.session_state.buffer_page_idx = page_idx + 1
+                st.rerun()
+
+        for i, memory in enumerate(buffered_memories, page_idx * PAGE_SIZE):
+            render_buffer_row(memory, i)
+
+        # Bulk actions: one POST handles every selected memory
+        st.subheader("Bulk Actions")
+        col1, col2 = st.columns(2)
+        with col1:
+            bulk_action = st.selectbox("Action", ["approve", "reject"], key="bulk_action")
+        with col2:
+            bulk_notes = st.text_input("Admin Notes (optional)", key="bulk_notes")
+
+        if st.button("Apply to Selected", key="apply_bulk"):
+            selected = [
+                m['id'] for m in buffered_memories
+                if st.session_state.get(f"select_{m['id']}")
+            ]
+            if not selected:
+                st.warning("No memories selected")
+            else:
+                response = post_json(
+                    f"{API_BASE_URL}/buffer/bulk",
+                    {"memory_ids": selected, "action": bulk_action, "notes": bulk_notes or None}
+                )
+                if response.status_code == 200:
+                    result = parse_json(response)
+                    fetch_buffered.clear()
+                    st.success(f"Processed {result.get('processed', 0)} memories")
+                    st.rerun()
+                else:
+                    st.error(f"Bulk {bulk_action} failed: {response.status_code}")
+
     except Exception as e:
         st.error(f"Error: {e}")
 
+@st.fragment
+def render_buffer_row(memory: Dict[str, Any], i: int):
+    """Render one buffered memory; approve/reject reruns only this fragment"""
+    with st.expander(f"Memory {i+1}: {memory['candidate']['content'][:100]}..."):
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            st.write(f"**Type:** {memory['candidate']['memory_type']}")
+            st.write(f"**Content:** {memory['candidate']['content']}")
+            st.write(f"**Salience Score:** {memory['candidate']['salience_score']:.3f}")
+            st.write(f"**Buffer Reason:** {memory['buffer_reason']}")
+            st.write(f"**Evidence:** {memory['candidate']['extraction_evidence']}")
+            st.write(f"**Buffered:** {memory['buffered_at']}")
+
+        with col2:
+            st.write(f"**Confidence:** {memory['candidate']['confidence']:.3f}")
+            st.write(f"**Relevance:** {memory['candidate']['relevance']:.3f}")
+            st.write(f"**Specificity:** {memory['candidate']['specificity']:.3f}")
+            st.write(f"**Buffer Score:** {memory['buffer_score']:.3f}")
+
+            # Selection for the bulk approve/reject action
+            st.checkbox("Select for bulk action", key=f"select_{memory['id']}")
+
 def show_stored_memories():
     """Show stored memories"""
     st.header("Stored Memories")
     st.markdown("View all accepted and stored memories.")
     
     try:
-        # Get stored memories
-        response = requests.get(f"{API_BASE_URL}/memories")
-        if response.status_code == 200:
-            stored_memories = response.json()
-            
-            if not stored_memories:
-                st.info("No stored memories found.")
-                return
-            
-            st.subheader(f"{len(stored_memories)} Stored Memories")
-            
-            # Filter options
-            col1, col2 = st.columns(2)
-            with col1:
-                memory_type_filter = st.selectbox(
-                    "Filter by Type",
-                    ["All"] + list(set([m['candidate']['memory_type'] for m in stored_memories]))
-                )
-            
-            with col2:
-                search_term = st.text_input("Search Content", "")
-            
-            # Apply filters
-            filtered_memories = stored_memories
-            if memory_type_filter != "All":
-                filtered_memories = [m for m in filtered_memories if m['candidate']['memory_type'] == memory_type_filter]
-            
-            if search_term:
-                filtered_memories = [m for m in filtered_memories if search_term.lower() in m['candidate']['content'].lower()]
-            
-            # Display filtered memories
-            for i, memory in enumerate(filtered_memories):
-                with st.expander(f"Memory {i+1}: {memory['candidate']['content'][:100]}..."):
-                    col1, col2 = st.columns([2, 1])
-                    
-                    with col1:
-                        st.write(f"**Type:** {memory['candidate']['memory_type']}")
-                        st.write(f"**Content:** {memory['final_content']}")
-                        st.write(f"**Salience Score:** {memory['candidate']['salience_score']:.3f}")
-                        st.write(f"**Decision:** {memory['decision']['action']}")
-                        st.write(f"**Reason:** {memory['decision']['reason']}")
-                        st.write(f"**Stored:** {memory['stored_at']}")
-                    
-                    with col2:
-                        st.write(f"**Confidence:** {memory['candidate']['confidence']:.3f}")
-                        st.write(f"**Relevance:** {memory['candidate']['relevance']:.3f}")
-                        st.write(f"**Specificity:** {memory['candidate']['specificity']:.3f}")
-                        if memory['decision'].get('admin_notes'):
-                            st.write(f"**Admin Notes:** {memory['decision']['admin_notes']}")
-        
-        else:
-            st.error("Failed to retrieve stored memories")
-            
+        # Get stored memories as a DataFrame (cached across reruns)
+        df = stored_memories_frame()
+
+        if st.button("Refresh", key="refresh_stored"):
+            fetch_stored.clear()
+            stored_memories_frame.clear()
+            st.rerun()
+
+        if df.empty:
+            st.info("No stored memories found.")
+            return
+
+        st.subheader(f"{len(df)} Stored Memories")
+
+        # Filter options
+        col1, col2 = st.columns(2)
+        with col1:
+            memory_type_filter = st.selectbox(
+                "Filter by Type",
+                ["All"] + list(Config.MEMORY_TYPE_ORDER)
+            )
+
+        with col2:
+            search_term = st.text_input("Search Content", "")
+
+        # Apply filters with vectorized column ops
+        mask = pd.Series(True, index=df.index)
+        if memory_type_filter != "All":
+            mask &= df["memory_type"].eq(memory_type_filter)
+
+        if search_term:
+            mask &= df["content_lower"].str.contains(search_term.lower(), regex=False)
+
+        filtered_memories = df.loc[mask, "record"].tolist()
+
+        # Display filtered memories, one page at a time
+        total_pages = max(1, (len(filtered_memories) + PAGE_SIZE - 1) // PAGE_SIZE)
+        page = st.number_input("Page", 1, total_pages, 1, key="stored_page")
+        page_start = (page - 1) * PAGE_SIZE
+
+        for i, memory in enumerate(filtered_memories[page_start:page_start + PAGE_SIZE], page_start):
+            with st.expander(f"Memory {i+1}: {memory['candidate']['content'][:100]}..."):
+                col1, col2 = st.columns([2, 1])
+
+                with col1:
+                    st.write(f"**Type:** {memory['candidate']['memory_type']}")
+                    st.write(f"**Content:** {memory['final_content']}")
+                    st.write(f"**Salience Score:** {memory['candidate']['salience_score']:.3f}")
+                    st.write(f"**Decision:** {memory['decision']['action']}")
+                    st.write(f"**Reason:** {memory['decision']['reason']}")
+                    st.write(f"**Stored:** {memory['stored_at']}")
+
+                with col2:
+                    st.write(f"**Confidence:** {memory['candidate']['confidence']:.3f}")
+                    st.write(f"**Relevance:** {memory['candidate']['relevance']:.3f}")
+                    st.write(f"**Specificity:** {memory['candidate']['specificity']:.3f}")
+                    if memory['decision'].get('admin_notes'):
+                        st.write(f"**Admin Notes:** {memory['decision']['admin_notes']}")
+
     except Exception as e:
         st.error(f"Error: {e}")
 
@@ -398,51 +548,46 @@ def show_system_health():
     st.markdown("Monitor system status and performance.")
     
     try:
-        # Get health information
-        response = requests.get(f"{API_BASE_URL}/health/db")
-        if response.status_code == 200:
-            health_data = response.json()
-            
-            # Health status
-            st.subheader("Health Status")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                st.json(health_data)
-            
-            with col2:
-                # Health indicators
-                service_status = health_data.get("status", "unknown")
-                db_status = health_data.get("database", "unknown")
-                
-                if service_status == "healthy":
-                    st.success("✅ Service is healthy")
-                else:
-                    st.error("❌ Service is unhealthy")
-                
-                if db_status == "connected":
-                    st.success("✅ Database is connected")
-                else:
-                    st.error("❌ Database connection failed")
-            
-            # Collection details
-            if "collections" in health_data:
-                collections = health_data["collections"]
-                
-                st.subheader("Collection Details")
-                
-                # Create a DataFrame for better visualization
-                df = pd.DataFrame([
-                    {"Collection": "Stored Memories", "Count": collections.get("stored_memories", 0)},
-                    {"Collection": "Buffered Memories", "Count": collections.get("buffered_memories", 0)},
-                    {"Collection": "Audit Logs", "Count": collections.get("audit_logs", 0)}
-                ])
-                
-                st.bar_chart(df.set_index("Collection"))
-        
-        else:
-            st.error("Failed to get health information")
-            
+        # Get health information (cached across reruns)
+        health_data = fetch_health()
+
+        # Health status
+        st.subheader("Health Status")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.json(health_data)
+
+        with col2:
+            # Health indicators
+            service_status = health_data.get("status", "unknown")
+            db_status = health_data.get("database", "unknown")
+
+            if service_status == "healthy":
+                st.success("✅ Service is healthy")
+            else:
+                st.error("❌ Service is unhealthy")
+
+            if db_status == "connected":
+                st.success("✅ Database is connected")
+            else:
+                st.error("❌ Database connection failed")
+
+        # Collection details
+        if "collections" in health_data:
+            collections = health_data["collections"]
+
+            st.subheader("Collection Details")
+
+            # Create a DataFrame for better visualization
+            df = pd.DataFrame([
+                {"Collection": "Stored Memories", "Count": collections.get("stored_memories", 0)},
+                {"Collection": "Buffered Memories", "Count": collections.get("buffered_memories", 0)},
+                {"Collection": "Audit Logs", "Count": collections.get("audit_logs", 0)}
+            ])
+
+            st.bar_chart(df.set_index("Collection"))
+
     except Exception as e:
         st.error(f"Error: {e}")
     
@@ -450,39 +595,12 @@ def show_system_health():
     st.subheader("Manual Health Check")
     if st.button("Check Health Now"):
         try:
-            response = requests.get(f"{API_BASE_URL}/health/db")
-            if response.status_code == 200:
-                st.success("Health check completed successfully")
-                st.json(response.json())
-            else:
-                st.error(f"Health check failed: {response.status_code}")
+            fetch_health.clear()
+            st.success("Health check completed successfully")
+            st.json(fetch_health())
         except Exception as e:
             st.error(f"Health check error: {e}")
 
-def approve_memory(memory_id: str):
-    """Approve a buffered memory"""
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/buffer/{memory_id}/approve",
-            json={"memory_id": memory_id, "action": "approve", "notes": ""}
-        )
-        return response.status_code == 200
-    except Exception as e:
-        st.error(f"Failed to approve memory: {e}")
-        return False
-
-def reject_memory(memory_id: str):
-    """Reject a buffered memory"""
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}/buffer/{memory_id}/reject",
-            json={"memory_id": memory_id, "action": "reject", "notes": ""}
-        )
-        return response.status_code == 200
-    except Exception as e:
-        st.error(f"Failed to reject memory: {e}")
-        return False
-
 if __name__ == "__main__":
     main()
 
@@ -1,10 +1,16 @@
 import os
+import re
+from dataclasses import dataclass
 from typing import Dict, Any
+import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Anchored key-shape check compiled once at import
+_OPENAI_KEY_RE = re.compile(r"^sk-[A-Za-z0-9_\-]{20,}$")
+
 class Config:
     """Configuration management for Decider service"""
     
@@ -15,6 +21,10 @@ class Config:
     # MongoDB Configuration
     MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/edy_decider")
     MONGODB_DB = os.getenv("MONGODB_DB", "edy_decider")
+    MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+    MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
     
     # Scoring Configuration
     SCORING_WEIGHTS = {
@@ -31,6 +41,17 @@ class Config:
         "feedback": float(os.getenv("FEEDBACK_THRESHOLD", "0.5"))
     }
     
+    # Fixed memory-type ordering for array-indexed threshold lookups
+    MEMORY_TYPE_ORDER = ("preference", "goal", "commitment", "skill", "feedback")
+    MEMORY_TYPE_INDEX = {name: i for i, name in enumerate(MEMORY_TYPE_ORDER)}
+    THRESHOLD_ARRAY = np.array([
+        THRESHOLDS["preference"],
+        THRESHOLDS["goal"],
+        THRESHOLDS["commitment"],
+        THRESHOLDS["skill"],
+        THRESHOLDS["feedback"],
+    ], dtype=np.float32)
+    
     # Service Configuration
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", "8000"))
@@ -40,13 +61,29 @@ class Config:
     SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.85"))
     BUFFER_THRESHOLD = float(os.getenv("BUFFER_THRESHOLD", "0.5"))
     
+    # Number of candidates the scorer fully ranks; the rest are still
+    # returned (and decided on) in arbitrary order. 0 ranks everything
+    SCORER_TOP_K = int(os.getenv("SCORER_TOP_K", "0"))
+    
+    # Buffered audit entries are flushed in one bulk write at this size
+    AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "100"))
+    
+    # Entries kept in the content-keyed embedding cache
+    EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+    
+    # Set once validate() succeeds so repeated calls are no-ops
+    _validated = False
+    
     @classmethod
     def validate(cls) -> bool:
         """Validate required configuration"""
+        if cls._validated:
+            return True
         if not cls.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is required")
-        if not cls.OPENAI_API_KEY.startswith("sk-"):
-            raise ValueError("OPENAI_API_KEY appears to be invalid (should start with 'sk-')")
+        if not _OPENAI_KEY_RE.match(cls.OPENAI_API_KEY):
+            raise ValueError("OPENAI_API_KEY appears to be invalid (expected 'sk-' followed by at least 20 key characters)")
+        cls._validated = True
         return True
     
     @classmethod
@@ -57,3 +94,19 @@ class Config:
         return cls.MONGODB_URI
 
 
+@dataclass(frozen=True, slots=True)
+class ScoringConfig:
+    """Scoring weights frozen into slot attributes for hot-path reads"""
+    relevance_w: float
+    specificity_w: float
+    confidence_w: float
+    buffer_threshold: float
+
+# Read once at import; slot attribute access avoids the per-candidate
+# dict getitem and string hash of Config.SCORING_WEIGHTS[...]
+SCORING = ScoringConfig(
+    relevance_w=Config.SCORING_WEIGHTS["relevance"],
+    specificity_w=Config.SCORING_WEIGHTS["specificity"],
+    confidence_w=Config.SCORING_WEIGHTS["confidence"],
+    buffer_threshold=Config.BUFFER_THRESHOLD,
+)
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from models import (
     ConversationTurn, CandidateMemory, MemoryDecision, 
     StoredMemory, BufferedMemory, ExtractionRequest, ExtractionResponse
@@ -8,10 +8,15 @@ from scorer import MemoryScorer
 from deduper import MemoryDeduper
 from storage import MemoryStorage
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# Seconds to reuse the cached dedup corpus before refetching from Mongo
+DEDUP_CACHE_TTL = 30.0
+
 class DeciderService:
     """Main orchestrator for the memory extraction and management pipeline"""
     
@@ -21,15 +26,50 @@ class DeciderService:
         self.deduper = MemoryDeduper()
         self.storage = MemoryStorage()
         
+        # Short-TTL cache of the dedup corpus, shared across requests
+        self._dedup_corpus = []
+        self._dedup_corpus_ts = 0.0
+        
+        # Overlaps the dedup-corpus fetch with extraction and scoring
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="decider")
+        
         logger.info("Decider service initialized")
     
+    def _get_dedup_corpus(self):
+        """Get the dedup corpus, refetching only when the TTL has expired"""
+        now = time.monotonic()
+        if not self._dedup_corpus or now - self._dedup_corpus_ts >= DEDUP_CACHE_TTL:
+            self._dedup_corpus = self.storage.get_dedup_corpus(limit=1000)
+            self._dedup_corpus_ts = now
+        return self._dedup_corpus
+    
+    def _invalidate_dedup_corpus(self):
+        """Force the next dedup to refetch from storage"""
+        self._dedup_corpus_ts = 0.0
+    
     def extract_and_store(self, request: ExtractionRequest) -> ExtractionResponse:
         """Main pipeline: extract, score, deduplicate, and store memories"""
         try:
+            # Too little context to extract from; skip the whole pipeline
+            if len(request.turns) < 2:
+                logger.info(f"Skipping extraction: only {len(request.turns)} turn(s) provided")
+                return ExtractionResponse(
+                    candidates=[],
+                    decisions=[],
+                    stored_count=0,
+                    buffered_count=0,
+                    rejected_count=0
+                )
+            
             logger.info(f"Processing extraction request with {len(request.turns)} conversation turns")
             
-            # Step 1: Extract candidate memories
-            candidates = self.extractor.extract_memories(request.turns)
+            # Kick off the dedup-corpus fetch so it overlaps extraction and
+            # scoring; pymongo releases the GIL while waiting on the network
+            corpus_future = self._executor.submit(self._get_dedup_corpus)
+            
+            # Step 1: Extract candidate memories; the extractor streams
+            # lazily, so materialize here where scoring needs the full batch
+            candidates = list(self.extractor.extract_memories(request.turns))
             logger.info(f"Extracted {len(candidates)} candidate memories")
             
             if not candidates:
@@ -45,52 +85,42 @@ class DeciderService:
             scored_candidates = self.scorer.score_memories(candidates)
             logger.info(f"Scored {len(scored_candidates)} candidates")
             
+            # Unpack once; the deduper and the response share this list
+            ranked_candidates = [candidate for candidate, _ in scored_candidates]
+            
             # Step 3: Make initial decisions based on scores
             initial_decisions = self.scorer.make_decisions(scored_candidates)
             
-            # Step 4: Deduplicate against stored memories and other candidates
+            # Step 4: Deduplicate against stored memories and other candidates.
+            # Embeddings are generated for the whole batch at once so the
+            # deduper can take its matrix path against the stored corpus.
+            candidate_embeddings = self.storage.generate_embeddings_batch(
+                [candidate.content for candidate in ranked_candidates]
+            )
             dedup_decisions, remaining_candidates = self.deduper.deduplicate_memories(
-                [c for c, _ in scored_candidates], 
-                self.storage.get_stored_memories(limit=1000)  # Get recent memories for dedup
+                ranked_candidates, 
+                corpus_future.result(),
+                candidate_embeddings=candidate_embeddings
             )
             
             # Combine all decisions
             all_decisions = initial_decisions + dedup_decisions
             
-            # Step 5: Process decisions and store/buffer memories
+            # Step 5: Process decisions, batching storage writes
             stored_count = 0
             buffered_count = 0
             rejected_count = 0
+            to_store = []
+            to_buffer = []
             
             for i, (candidate, score) in enumerate(scored_candidates):
                 decision = all_decisions[i] if i < len(all_decisions) else initial_decisions[i]
                 
                 if decision.action == "keep":
-                    # Store the memory
-                    try:
-                        memory_id = self.storage.store_memory(
-                            candidate, decision, candidate.content
-                        )
-                        stored_count += 1
-                        logger.info(f"Stored memory: {memory_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to store memory: {e}")
-                        # Fall back to buffering
-                        decision.action = "buffer"
-                        decision.reason = f"Storage failed, buffering instead: {e}"
+                    to_store.append((candidate, decision, candidate.content))
                 
-                if decision.action == "buffer":
-                    # Buffer for admin review
-                    try:
-                        logger.info(f"Buffering memory: {candidate.content[:50]}...")
-                        buffer_id = self.storage.buffer_memory(
-                            candidate, decision.reason, score
-                        )
-                        buffered_count += 1
-                        logger.info(f"Successfully buffered memory: {buffer_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to buffer memory: {e}")
-                        rejected_count += 1
+                elif decision.action == "buffer":
+                    to_buffer.append((candidate, decision.reason, score))
                 
                 elif decision.action == "reject":
                     rejected_count += 1
@@ -100,15 +130,38 @@ class DeciderService:
                     # Memory was merged, count as processed
                     logger.info(f"Merged memory: {candidate.content[:50]}...")
             
+            # One round-trip per collection instead of one per candidate
+            if to_store:
+                try:
+                    stored_ids = self.storage.store_memories_bulk(to_store)
+                    stored_count = len(stored_ids)
+                except Exception as e:
+                    logger.error(f"Bulk store failed, buffering instead: {e}")
+                    to_buffer.extend(
+                        (candidate, f"Storage failed, buffering instead: {e}", candidate.salience_score)
+                        for candidate, _, _ in to_store
+                    )
+            
+            if to_buffer:
+                try:
+                    buffer_ids = self.storage.buffer_memories_bulk(to_buffer)
+                    buffered_count = len(buffer_ids)
+                except Exception as e:
+                    logger.error(f"Bulk buffer failed: {e}")
+                    rejected_count += len(to_buffer)
+            
             # Create response
             response = ExtractionResponse(
-                candidates=[c for c, _ in scored_candidates],
+                candidates=ranked_candidates,
                 decisions=all_decisions,
                 stored_count=stored_count,
                 buffered_count=buffered_count,
                 rejected_count=rejected_count
             )
             
+            if stored_count:
+                self._invalidate_dedup_corpus()
+            
             logger.info(f"Pipeline completed: {stored_count} stored, {buffered_count} buffered, {rejected_count} rejected")
             return response
             
@@ -124,10 +177,11 @@ class DeciderService:
             logger.error(f"Failed to retrieve memories: {e}")
             return []
     
-    def get_buffered_memories(self, limit: int = 100, offset: int = 0) -> List[BufferedMemory]:
+    def get_buffered_memories(self, limit: int = 100, offset: int = 0,
+                              after: Optional[Tuple[datetime, str]] = None) -> List[BufferedMemory]:
         """Retrieve buffered memories for admin review"""
         try:
-            return self.storage.get_buffered_memories(limit=limit, offset=offset)
+            return self.storage.get_buffered_memories(limit=limit, offset=offset, after=after)
         except Exception as e:
             logger.error(f"Failed to retrieve buffered memories: {e}")
             return []
@@ -135,7 +189,10 @@ class DeciderService:
     def approve_buffered_memory(self, memory_id: str, admin_notes: str = None) -> bool:
         """Approve a buffered memory"""
         try:
-            return self.storage.approve_buffered_memory(memory_id, admin_notes)
+            approved = self.storage.approve_buffered_memory(memory_id, admin_notes)
+            if approved:
+                self._invalidate_dedup_corpus()
+            return approved
         except Exception as e:
             logger.error(f"Failed to approve buffered memory: {e}")
             return False
@@ -148,6 +205,28 @@ class DeciderService:
             logger.error(f"Failed to reject buffered memory: {e}")
             return False
     
+    def bulk_review(self, memory_ids: List[str], action: str, admin_notes: str = None) -> Dict[str, int]:
+        """Approve or reject a batch of buffered memories in one call"""
+        processed = 0
+        failed = 0
+        handler = (
+            self.storage.approve_buffered_memory if action == "approve"
+            else self.storage.reject_buffered_memory
+        )
+        for memory_id in memory_ids:
+            try:
+                if handler(memory_id, admin_notes):
+                    processed += 1
+                else:
+                    failed += 1
+            except Exception as e:
+                logger.error(f"Bulk {action} failed for {memory_id}: {e}")
+                failed += 1
+        if action == "approve" and processed:
+            self._invalidate_dedup_corpus()
+        logger.info(f"Bulk {action}: {processed} processed, {failed} failed")
+        return {"processed": processed, "failed": failed}
+    
     def health_check(self) -> Dict[str, Any]:
         """Check service health"""
         try:
@@ -175,6 +254,7 @@ class DeciderService:
     def close(self):
         """Cleanup resources"""
         try:
+            self._executor.shutdown(wait=False)
             self.storage.close()
             logger.info("Decider service closed")
         except Exception as e:
@@ -1,29 +1,50 @@
+import threading
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Tuple, Dict, Set
-from models import CandidateMemory, MemoryDecision, StoredMemory
+from typing import List, Tuple, Dict, Set, Optional
+from models import CandidateMemory, MemoryDecision, DedupEntry
 from config import Config
+from deduper_kernels import pairwise_jaccard as _pairwise_jaccard_numba
 import logging
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# Vectorized popcount: prefer the native ufunc (NumPy >= 2.0), otherwise
+# fall back to an 8-bit lookup table over the packed words
+_BITWISE_COUNT = getattr(np, "bitwise_count", None)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+def _popcount(packed: np.ndarray) -> np.ndarray:
+    """Count set bits along the last axis of a packed uint64 array"""
+    if _BITWISE_COUNT is not None:
+        return _BITWISE_COUNT(packed).sum(axis=-1)
+    byte_view = packed.view(np.uint8).reshape(packed.shape[:-1] + (-1,))
+    return _POPCOUNT_TABLE[byte_view].sum(axis=-1)
+
 class MemoryDeduper:
     """Deduplicates memories using embedding cosine similarity"""
     
     def __init__(self):
         self.similarity_threshold = Config.SIMILARITY_THRESHOLD
+        # Cached L2-normalized stored-embedding matrix, keyed by the id
+        # list; rebuilt and read under the lock since requests run
+        # concurrently on the FastAPI threadpool
+        self._stored_matrix = None
+        self._stored_ids = []
+        self._stored_key = None
+        self._stored_lock = threading.Lock()
         
     def deduplicate_memories(
         self, 
         candidates: List[CandidateMemory], 
-        stored_memories: List[StoredMemory]
+        stored_memories: List[DedupEntry],
+        candidate_embeddings: Optional[np.ndarray] = None
     ) -> Tuple[List[MemoryDecision], List[CandidateMemory]]:
         """Deduplicate candidates against stored memories and other candidates"""
         
         # First, deduplicate against stored memories
         decisions, remaining_candidates = self._deduplicate_against_stored(
-            candidates, stored_memories
+            candidates, stored_memories, candidate_embeddings
         )
         
         # Then, deduplicate remaining candidates against each other
@@ -35,24 +56,68 @@ class MemoryDeduper:
     def _deduplicate_against_stored(
         self, 
         candidates: List[CandidateMemory], 
-        stored_memories: List[StoredMemory]
+        stored_memories: List[DedupEntry],
+        candidate_embeddings: Optional[np.ndarray] = None
     ) -> Tuple[List[MemoryDecision], List[CandidateMemory]]:
         """Deduplicate candidates against already stored memories"""
         decisions = []
         remaining_candidates = []
         
+        # Embedding path: one GEMM against the cached normalized stored
+        # matrix replaces the per-pair text comparison
+        stored_matrix, stored_ids = self._get_stored_matrix(stored_memories)
+        if candidate_embeddings is not None and stored_matrix is not None and candidates:
+            candidate_matrix = self._normalize_rows(
+                np.asarray(candidate_embeddings, dtype=np.float32)
+            )
+            similarities = candidate_matrix @ stored_matrix.T
+            best_indices = similarities.argmax(axis=1)
+            best_similarities = similarities.max(axis=1)
+            stored_by_id = {stored.id: stored for stored in stored_memories}
+            
+            for k, candidate in enumerate(candidates):
+                best_similarity = float(best_similarities[k])
+                if best_similarity >= self.similarity_threshold:
+                    best_match = stored_by_id[stored_ids[int(best_indices[k])]]
+                    decisions.append(MemoryDecision(
+                        action="merge",
+                        reason=f"Similarity {best_similarity:.3f} with stored memory '{best_match.final_content[:50]}...'",
+                        merged_with=best_match.id
+                    ))
+                    logger.info(f"Merging candidate with stored memory (similarity: {best_similarity:.3f})")
+                else:
+                    remaining_candidates.append(candidate)
+            
+            return decisions, remaining_candidates
+        
+        # Jaccard can never exceed min(|A|,|B|)/max(|A|,|B|), so token
+        # counts from the cached token sets prune impossible pairs up front
+        stored_sizes = [len(stored.tokens()) for stored in stored_memories]
+
         for candidate in candidates:
             best_match = None
             best_similarity = 0.0
-            
-            for stored in stored_memories:
+            candidate_tokens = candidate.tokens()
+            candidate_size = len(candidate_tokens)
+
+            for stored, stored_size in zip(stored_memories, stored_sizes):
                 if stored.embedding is None:
                     continue
-                    
+
+                if candidate_size and stored_size:
+                    size_bound = min(candidate_size, stored_size) / max(candidate_size, stored_size)
+                    if size_bound < self.similarity_threshold:
+                        continue
+
                 # For now, use simple text similarity (could be enhanced with embeddings)
-                similarity = self._calculate_text_similarity(
-                    candidate.content, stored.final_content
-                )
+                similarity = self._jaccard(candidate_tokens, stored.tokens())
+                
+                if similarity >= self.similarity_threshold:
+                    # Any match above the threshold triggers a merge; the
+                    # single best match is only cosmetic, so stop scanning
+                    best_similarity = similarity
+                    best_match = stored
+                    break
                 
                 if similarity > best_similarity:
                     best_similarity = similarity
@@ -72,61 +137,133 @@ class MemoryDeduper:
         
         return decisions, remaining_candidates
     
+    def _get_stored_matrix(self, stored_memories: List[DedupEntry]):
+        """Get the normalized stored-embedding matrix, rebuilt only on change
+        
+        New writes are unit-length already (StoredMemory normalizes at
+        construction); the row normalization here is idempotent for those
+        and only does real work for rows stored before that change.
+        """
+        key = hash(tuple(stored.id for stored in stored_memories))
+        with self._stored_lock:
+            if key != self._stored_key:
+                rows = []
+                ids = []
+                for stored in stored_memories:
+                    if stored.embedding is not None:
+                        rows.append(np.asarray(stored.embedding, dtype=np.float32))
+                        ids.append(stored.id)
+                self._stored_matrix = self._normalize_rows(np.vstack(rows)) if rows else None
+                self._stored_ids = ids
+                self._stored_key = key
+            return self._stored_matrix, self._stored_ids
+    
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalize rows in place without np.linalg.norm overhead"""
+        norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+        norms[norms == 0] = 1.0
+        matrix /= norms[:, None]
+        return matrix
+    
     def _deduplicate_candidates(self, candidates: List[CandidateMemory]) -> List[MemoryDecision]:
         """Deduplicate candidates against each other"""
-        decisions = []
-        processed = set()
+        similarity_matrix = self._pairwise_jaccard(candidates)
+        pairs = np.argwhere(np.triu(similarity_matrix, k=1) >= self.similarity_threshold)
+        if pairs.size == 0:
+            return []
+        
+        # Union-find groups transitively similar candidates into clusters,
+        # avoiding the greedy pairwise merge chains of the old loop
+        parent = list(range(len(candidates)))
+        
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
         
-        for i, candidate1 in enumerate(candidates):
-            if i in processed:
+        for i, j in pairs:
+            root_i, root_j = find(int(i)), find(int(j))
+            if root_i != root_j:
+                parent[root_j] = root_i
+        
+        # Only indices that appear in a similar pair can end up in a
+        # multi-member cluster; a bool bitmap narrows the grouping pass
+        # to those rows instead of walking every candidate
+        involved = np.zeros(len(candidates), dtype=bool)
+        involved[pairs.ravel()] = True
+        
+        clusters: Dict[int, List[int]] = {}
+        for idx in np.flatnonzero(involved):
+            idx = int(idx)
+            clusters.setdefault(find(idx), []).append(idx)
+        
+        # Each cluster keeps its highest-salience member; the rest merge
+        decisions = []
+        for members in clusters.values():
+            if len(members) < 2:
                 continue
-                
-            for j, candidate2 in enumerate(candidates[i+1:], i+1):
-                if j in processed:
+            
+            keep_idx = max(members, key=lambda k: candidates[k].salience_score)
+            keep_candidate = candidates[keep_idx]
+            
+            for merge_idx in members:
+                if merge_idx == keep_idx:
                     continue
-                    
-                similarity = self._calculate_text_similarity(
-                    candidate1.content, candidate2.content
-                )
                 
-                if similarity >= self.similarity_threshold:
-                    # Keep the higher-scoring candidate
-                    if candidate1.salience_score >= candidate2.salience_score:
-                        keep_candidate = candidate1
-                        merge_candidate = candidate2
-                        keep_idx, merge_idx = i, j
-                    else:
-                        keep_candidate = candidate2
-                        merge_candidate = candidate1
-                        keep_idx, merge_idx = j, i
-                    
-                    decision = MemoryDecision(
-                        action="merge",
-                        reason=f"Similarity {similarity:.3f} with candidate '{merge_candidate.content[:50]}...'",
-                        merged_with=keep_candidate.id
-                    )
-                    decisions.append(decision)
-                    
-                    processed.add(merge_idx)
-                    logger.info(f"Merging candidate {merge_idx} into candidate {keep_idx} (similarity: {similarity:.3f})")
+                similarity = float(similarity_matrix[keep_idx, merge_idx])
+                decision = MemoryDecision(
+                    action="merge",
+                    reason=f"Similarity {similarity:.3f} with candidate '{candidates[merge_idx].content[:50]}...'",
+                    merged_with=keep_candidate.id
+                )
+                decisions.append(decision)
+                logger.info(f"Merging candidate {merge_idx} into candidate {keep_idx} (similarity: {similarity:.3f})")
         
         return decisions
     
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Calculate text similarity using simple word overlap (placeholder for embeddings)"""
+    def _pairwise_jaccard(self, candidates: List[CandidateMemory]) -> np.ndarray:
+        """Compute the full candidate Jaccard matrix over bit-packed token sets"""
+        token_sets = [c.tokens() for c in candidates]
+        
+        vocab = {}
+        for tokens in token_sets:
+            for token in tokens:
+                if token not in vocab:
+                    vocab[token] = len(vocab)
+        
+        # Pack each token set into 64-bit words: intersection becomes
+        # AND + popcount instead of a float matmul over the vocabulary
+        words = max((len(vocab) + 63) // 64, 1)
+        packed = np.zeros((len(candidates), words), dtype=np.uint64)
+        for row, tokens in enumerate(token_sets):
+            for token in tokens:
+                idx = vocab[token]
+                packed[row, idx >> 6] |= np.uint64(1 << (idx & 63))
+        
+        sizes = _popcount(packed).astype(np.float32)
+        
+        # The Numba kernel avoids materializing the N x N x words AND
+        # intermediate and runs the pair loop across cores
+        if _pairwise_jaccard_numba is not None:
+            return _pairwise_jaccard_numba(packed, sizes)
+        
+        intersections = _popcount(packed[:, None, :] & packed[None, :, :]).astype(np.float32)
+        unions = sizes[:, None] + sizes[None, :] - intersections
+        return np.where(unions > 0, intersections / unions, 0.0)
+    
+    @staticmethod
+    def _jaccard(tokens1, tokens2) -> float:
+        """Jaccard similarity over pre-tokenized word sets"""
         # This is a simplified similarity measure
         # In production, you'd use proper embeddings from OpenAI or similar
         
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
-        if not words1 or not words2:
+        if not tokens1 or not tokens2:
             return 0.0
         
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
-        
-        return intersection / union if union > 0 else 0.0
+        union = len(tokens1 | tokens2)
+        return len(tokens1 & tokens2) / union if union > 0 else 0.0
     
 
 
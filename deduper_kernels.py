@@ -0,0 +1,39 @@
+import numpy as np
+
+# Numba is optional: when present, the pairwise Jaccard kernel runs as a
+# parallel JIT-compiled loop; when absent the deduper keeps its NumPy path
+try:
+    from numba import njit, prange
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+if _NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _pairwise_jaccard_kernel(packed, sizes, out):
+        n = packed.shape[0]
+        words = packed.shape[1]
+        for i in prange(n):
+            out[i, i] = 1.0 if sizes[i] > 0 else 0.0
+            for j in range(i + 1, n):
+                inter = 0
+                for k in range(words):
+                    value = packed[i, k] & packed[j, k]
+                    while value:
+                        value &= value - np.uint64(1)
+                        inter += 1
+                union = sizes[i] + sizes[j] - inter
+                similarity = inter / union if union > 0 else 0.0
+                out[i, j] = similarity
+                out[j, i] = similarity
+
+    def pairwise_jaccard(packed: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        """Pairwise Jaccard over bit-packed token sets, JIT-compiled"""
+        out = np.zeros((packed.shape[0], packed.shape[0]), dtype=np.float32)
+        _pairwise_jaccard_kernel(packed, sizes.astype(np.float32), out)
+        return out
+
+    # Warm the JIT at import so the first request doesn't pay compile time
+    pairwise_jaccard(np.zeros((2, 1), dtype=np.uint64), np.zeros(2, dtype=np.float32))
+else:
+    pairwise_jaccard = None
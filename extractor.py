@@ -5,19 +5,26 @@ Extracts candidate memories from conversation turns using NLP and pattern matchi
 """
 
 import re
+import hashlib
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator
 from datetime import datetime, timezone
 from models import ConversationTurn, CandidateMemory, MemoryType
 
 logger = logging.getLogger(__name__)
 
+# Identical turn lists are re-submitted freely from the admin UI;
+# cache their extraction results keyed on a digest of the turns
+_CACHE_MAX_ENTRIES = 256
+
 class MemoryExtractor:
     """Extracts candidate memories from conversation turns"""
     
     def __init__(self):
-        # Pattern-based extraction rules
-        self.patterns = {
+        # Pattern-based extraction rules, compiled once
+        raw_patterns = {
             MemoryType.PREFERENCE: [
                 r'\b(?:I|I\'m|I am)\s+(?:prefer|like|enjoy|love|hate|dislike)\s+(?:to\s+)?(.+?)(?:\.|!|\?|$)',
                 r'\b(?:I|I\'m|I am)\s+(?:not\s+)?(?:a\s+)?(?:fan\s+of|fond\s+of)\s+(.+?)(?:\.|!|\?|$)',
@@ -45,6 +52,11 @@ class MemoryExtractor:
             ]
         }
         
+        self.patterns = {
+            memory_type: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for memory_type, patterns in raw_patterns.items()
+        }
+
         # Confidence scoring weights
         self.confidence_weights = {
             'pattern_match': 0.6,
@@ -52,55 +64,119 @@ class MemoryExtractor:
             'context_relevance': 0.2
         }
         
+        # Keyword sets built once so scoring does set intersections
+        # instead of substring scans per keyword
+        self._relevance_words = frozenset({'learn', 'study', 'work', 'practice', 'improve', 'develop'})
+        self._specificity_phrases = ('python', 'machine learning', 'data science', '2 hours', 'every evening')
+        self._digit_re = re.compile(r'\d')
+        
+        # Every extraction pattern anchors on one of these first-person /
+        # demonstrative opener words; a turn containing none of them
+        # cannot match, so the full scan is skipped entirely. The \b
+        # anchors mirror the extraction patterns exactly, so quotes,
+        # dashes, and any whitespace around the anchor behave the same
+        # here as in the real patterns.
+        self._anchor_pattern = re.compile(r"\b(?:i|my|the|this|that|it)\b")
+        
+        # Content-hash LRU of extraction results; endpoints run on the
+        # FastAPI threadpool, so all access goes through the lock
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         logger.info("MemoryExtractor initialized with pattern-based extraction rules")
     
-    def extract_memories(self, turns: List[ConversationTurn]) -> List[CandidateMemory]:
-        """Extract candidate memories from conversation turns"""
-        candidates = []
-        
+    def extract_memories(self, turns: List[ConversationTurn]) -> Iterator[CandidateMemory]:
+        """Lazily extract candidate memories from conversation turns
+        
+        Yields candidates as they are produced so callers can stream them;
+        materialize with list() only where random access is needed. The
+        result is cached once the generator is fully consumed.
+        """
+        cache_key = self._cache_key(turns)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                # Copy while holding the lock so an eviction on another
+                # thread cannot race the iteration
+                cached = [candidate.model_copy(deep=True) for candidate in cached]
+        if cached is not None:
+            logger.info(f"Extractor cache hit for {len(turns)} turns")
+            now = datetime.now(timezone.utc)
+            for fresh in cached:
+                fresh.created_at = now
+                yield fresh
+            return
+        
+        count = 0
+        # Deep copies keep cached entries isolated from downstream mutation
+        snapshot = []
         for turn in turns:
             if turn.speaker.lower() == "user":  # Only extract from user statements
-                turn_candidates = self._extract_from_turn(turn)
-                candidates.extend(turn_candidates)
+                for candidate in self._extract_from_turn(turn):
+                    count += 1
+                    snapshot.append(candidate.model_copy(deep=True))
+                    yield candidate
+        
+        with self._cache_lock:
+            self._cache[cache_key] = snapshot
+            if len(self._cache) > _CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
         
-        logger.info(f"Extracted {len(candidates)} candidate memories from {len(turns)} turns")
-        return candidates
+        logger.info(f"Extracted {count} candidate memories from {len(turns)} turns")
+    
+    def _cache_key(self, turns: List[ConversationTurn]) -> bytes:
+        """Digest of speaker/text pairs identifying a turn list"""
+        hasher = hashlib.blake2b(digest_size=16)
+        for turn in turns:
+            hasher.update(turn.speaker.encode())
+            hasher.update(b":")
+            hasher.update(turn.text.encode())
+            hasher.update(b"\n")
+        return hasher.digest()
     
-    def _extract_from_turn(self, turn: ConversationTurn) -> List[CandidateMemory]:
-        """Extract memories from a single conversation turn"""
-        candidates = []
+    def _extract_from_turn(self, turn: ConversationTurn) -> Iterator[CandidateMemory]:
+        """Yield memories extracted from a single conversation turn"""
         text = turn.text.strip()
+        text_lower = text.lower()
         
         # Skip very short or non-informative turns
-        if len(text) < 10 or text.lower() in ['yes', 'no', 'ok', 'okay', 'thanks', 'thank you']:
-            return candidates
+        if len(text) < 10 or text_lower in ['yes', 'no', 'ok', 'okay', 'thanks', 'thank you']:
+            return
         
-        # Check each memory type pattern
+        # Cheap prefilter: acknowledgements and other turns without a
+        # pattern anchor short-circuit before the expensive scan
+        if self._anchor_pattern.search(text_lower) is None:
+            return
+        
+        # Each compiled pattern scans independently: a span consumed by
+        # one rule must stay visible to the others, so the per-type
+        # matches cannot be fused into a single alternation pass
         for memory_type, patterns in self.patterns.items():
             for pattern in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                
-                for match in matches:
+                for match in pattern.finditer(text):
                     content = match.group(1).strip()
-                    
+                    content_lower = content.lower()
+
                     # Skip if content is too short or generic
-                    if len(content) < 5 or content.lower() in ['it', 'this', 'that', 'something', 'things']:
+                    if len(content) < 5 or content_lower in ['it', 'this', 'that', 'something', 'things']:
                         continue
-                    
+
+                    tokens = frozenset(content_lower.split())
+
                     # Calculate confidence score
-                    confidence = self._calculate_confidence(text, content, memory_type, pattern)
-                    
+                    confidence = self._calculate_confidence(text, content, memory_type)
+
                     # Calculate relevance score
-                    relevance = self._calculate_relevance(content, memory_type)
-                    
+                    relevance = self._calculate_relevance(content_lower, tokens)
+
                     # Calculate specificity score
-                    specificity = self._calculate_specificity(content)
-                    
+                    specificity = self._calculate_specificity(content_lower)
+
                     # Calculate overall salience score
                     salience_score = (confidence * 0.4 + relevance * 0.4 + specificity * 0.2)
-                    
-                    # Create candidate memory
-                    candidate = CandidateMemory(
+
+                    yield CandidateMemory(
                         memory_type=memory_type,
                         content=content,
                         confidence=confidence,
@@ -108,21 +184,15 @@ class MemoryExtractor:
                         specificity=specificity,
                         salience_score=salience_score,
                         source_turn=turn,
-                        extraction_evidence=f"Pattern match: {pattern}",
+                        extraction_evidence=f"Pattern match: {pattern.pattern}",
                         created_at=datetime.now(timezone.utc)
                     )
-                    
-                    candidates.append(candidate)
-        
-        return candidates
     
-    def _calculate_confidence(self, text: str, content: str, memory_type: MemoryType, pattern: str) -> float:
+    def _calculate_confidence(self, text: str, content: str, memory_type: MemoryType) -> float:
         """Calculate confidence score for extracted memory"""
-        confidence = 0.0
-        
-        # Pattern match quality
-        if re.search(pattern, text, re.IGNORECASE):
-            confidence += 0.6
+        # Pattern match quality: the caller only gets here on a match,
+        # so the old re-scan of the same pattern is a constant
+        confidence = 0.6
         
         # Sentence structure quality
         if text.endswith('.') or text.endswith('!') or text.endswith('?'):
@@ -134,30 +204,30 @@ class MemoryExtractor:
         
         return min(confidence, 1.0)
     
-    def _calculate_relevance(self, content: str, memory_type: MemoryType) -> float:
+    def _calculate_relevance(self, content_lower: str, tokens: frozenset) -> float:
         """Calculate relevance score for memory content"""
         relevance = 0.5  # Base relevance
         
         # Boost relevance for specific, actionable content
-        if any(word in content.lower() for word in ['learn', 'study', 'work', 'practice', 'improve', 'develop']):
+        if tokens & self._relevance_words:
             relevance += 0.3
         
         # Boost for personal statements
-        if content.lower().startswith(('i ', 'my ', 'me ')):
+        if content_lower.startswith(('i ', 'my ', 'me ')):
             relevance += 0.2
         
         return min(relevance, 1.0)
     
-    def _calculate_specificity(self, content: str) -> float:
+    def _calculate_specificity(self, content_lower: str) -> float:
         """Calculate specificity score for memory content"""
         specificity = 0.5  # Base specificity
         
         # Boost for specific details
-        if any(word in content.lower() for word in ['python', 'machine learning', 'data science', '2 hours', 'every evening']):
+        if any(phrase in content_lower for phrase in self._specificity_phrases):
             specificity += 0.3
         
         # Boost for measurable commitments
-        if re.search(r'\d+', content):
+        if self._digit_re.search(content_lower):
             specificity += 0.2
         
         return min(specificity, 1.0)
@@ -1,12 +1,14 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from datetime import datetime
 import logging
-from typing import List
+from typing import List, Optional
 
 from models import (
     ExtractionRequest, ExtractionResponse, AdminReviewRequest,
-    StoredMemory, BufferedMemory, HealthResponse
+    BulkReviewRequest, StoredMemory, BufferedMemory, HealthResponse
 )
 from decider_service import DeciderService
 from config import Config
@@ -46,7 +48,8 @@ app = FastAPI(
     title="Decider v1 - Memory Management Service",
     description="Extractor-Scorer-Deduper service for conversational memories",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -64,8 +67,11 @@ def get_service() -> DeciderService:
         raise HTTPException(status_code=503, detail="Service not available")
     return decider_service
 
+# Endpoints are plain `def` on purpose: the pipeline is synchronous and
+# CPU-bound, and FastAPI schedules sync endpoints on its threadpool, so
+# concurrent requests overlap instead of blocking the event loop.
 @app.post("/extract_and_store", response_model=ExtractionResponse)
-async def extract_and_store_memories(
+def extract_and_store_memories(
     request: ExtractionRequest,
     service: DeciderService = Depends(get_service)
 ):
@@ -78,7 +84,7 @@ async def extract_and_store_memories(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/memories", response_model=List[StoredMemory])
-async def get_memories(
+def get_memories(
     limit: int = 100,
     offset: int = 0,
     service: DeciderService = Depends(get_service)
@@ -92,21 +98,43 @@ async def get_memories(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/buffer", response_model=List[BufferedMemory])
-async def get_buffered_memories(
+def get_buffered_memories(
     limit: int = 100,
     offset: int = 0,
+    after_ts: Optional[datetime] = None,
+    after_id: Optional[str] = None,
     service: DeciderService = Depends(get_service)
 ):
-    """Retrieve buffered memories for admin review"""
+    """Retrieve buffered memories for admin review
+    
+    Pass after_ts/after_id from the last row of the previous page for
+    keyset pagination; otherwise offset-based paging applies.
+    """
     try:
-        memories = service.get_buffered_memories(limit=limit, offset=offset)
+        after = (after_ts, after_id) if after_ts is not None and after_id is not None else None
+        memories = service.get_buffered_memories(limit=limit, offset=offset, after=after)
         return memories
     except Exception as e:
         logging.error(f"Error retrieving buffered memories: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/buffer/bulk")
+def bulk_review_buffered_memories(
+    request: BulkReviewRequest,
+    service: DeciderService = Depends(get_service)
+):
+    """Approve or reject multiple buffered memories in one request"""
+    if request.action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="Action must be 'approve' or 'reject'")
+    try:
+        result = service.bulk_review(request.memory_ids, request.action, request.notes)
+        return {"message": f"Bulk {request.action} completed", **result}
+    except Exception as e:
+        logging.error(f"Error in bulk review: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/buffer/{memory_id}/approve")
-async def approve_buffered_memory(
+def approve_buffered_memory(
     memory_id: str,
     request: AdminReviewRequest,
     service: DeciderService = Depends(get_service)
@@ -126,7 +154,7 @@ async def approve_buffered_memory(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/buffer/{memory_id}/reject")
-async def reject_buffered_memory(
+def reject_buffered_memory(
     memory_id: str,
     request: AdminReviewRequest,
     service: DeciderService = Depends(get_service)
@@ -146,7 +174,7 @@ async def reject_buffered_memory(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health/db", response_model=HealthResponse)
-async def health_check(service: DeciderService = Depends(get_service)):
+def health_check(service: DeciderService = Depends(get_service)):
     """Check database and service health"""
     try:
         health = service.health_check()
@@ -1,8 +1,17 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, WithJsonSchema, field_serializer, field_validator
+from typing import Annotated, List, Optional, Dict, Any, FrozenSet
 from datetime import datetime, timezone
 from enum import Enum
 
+# ndarray fields need an explicit JSON schema: pydantic v2 cannot derive
+# one from the is-instance check that arbitrary_types_allowed produces,
+# which would break /openapi.json for response models embedding them
+EmbeddingArray = Annotated[
+    np.ndarray,
+    WithJsonSchema({"type": "array", "items": {"type": "number"}}),
+]
+
 class MemoryType(str, Enum):
     """Types of memories that can be extracted"""
     PREFERENCE = "preference"
@@ -31,10 +40,13 @@ class CandidateMemory(BaseModel):
     extraction_evidence: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    _tokens: Optional[FrozenSet[str]] = PrivateAttr(default=None)
+
+    def tokens(self) -> FrozenSet[str]:
+        """Lowercased token set of the content, computed once per instance"""
+        if self._tokens is None:
+            self._tokens = frozenset(self.content.lower().split())
+        return self._tokens
 
 class MemoryDecision(BaseModel):
     """Decision made about a candidate memory"""
@@ -50,13 +62,56 @@ class StoredMemory(BaseModel):
     candidate: CandidateMemory
     decision: MemoryDecision
     final_content: str
-    embedding: Optional[List[float]] = None
+    # Held as a contiguous float32 ndarray (~7x smaller than a list of
+    # Python floats); incoming lists are coerced by the validator
+    embedding: Optional[EmbeddingArray] = None
     stored_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    @field_validator("embedding", mode="before")
+    @classmethod
+    def _coerce_embedding(cls, value):
+        """Coerce to float32 and L2-normalize at construction, so cosine
+        similarity downstream reduces to a plain dot product"""
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray)):
+            # Packed float32 bytes as written by the storage layer
+            value = np.frombuffer(value, dtype=np.float32)
+        vector = np.asarray(value, dtype=np.float32)
+        norm = np.sqrt(np.vdot(vector, vector))
+        return vector / norm if norm > 0 else vector
+    
+    @field_serializer("embedding")
+    def _serialize_embedding(self, value: Optional[np.ndarray]):
+        return value.tolist() if value is not None else None
+
+class DedupEntry(BaseModel):
+    """Lightweight projection of a stored memory used for deduplication"""
+    id: str
+    final_content: str
+    embedding: Optional[EmbeddingArray] = None
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    @field_validator("embedding", mode="before")
+    @classmethod
+    def _decode_embedding(cls, value):
+        """Accept packed float32 bytes or the legacy list-of-floats form"""
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray)):
+            return np.frombuffer(value, dtype=np.float32)
+        return np.asarray(value, dtype=np.float32)
+    
+    _tokens: Optional[FrozenSet[str]] = PrivateAttr(default=None)
+
+    def tokens(self) -> FrozenSet[str]:
+        """Lowercased token set of the content, computed once per instance"""
+        if self._tokens is None:
+            self._tokens = frozenset(self.final_content.lower().split())
+        return self._tokens
 
 class BufferedMemory(BaseModel):
     """A memory waiting for admin review"""
@@ -65,11 +120,6 @@ class BufferedMemory(BaseModel):
     buffer_reason: str
     buffer_score: float
     buffered_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 class ExtractionRequest(BaseModel):
     """Request to extract memories from conversation turns"""
@@ -93,16 +143,17 @@ class AdminReviewRequest(BaseModel):
     notes: Optional[str] = None
     modified_content: Optional[str] = None
 
+class BulkReviewRequest(BaseModel):
+    """Request to review several buffered memories in one call"""
+    memory_ids: List[str]
+    action: str  # "approve", "reject"
+    notes: Optional[str] = None
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     database: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     collections: Optional[Dict[str, int]] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
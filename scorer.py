@@ -1,6 +1,9 @@
+from collections import Counter
 from typing import List, Tuple
+import numpy as np
 from models import CandidateMemory, MemoryType, MemoryDecision
-from config import Config
+from config import Config, SCORING
+from scorer_numba import score_and_classify as _score_and_classify
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,72 +14,182 @@ class MemoryScorer:
     def __init__(self):
         self.weights = Config.SCORING_WEIGHTS
         self.thresholds = Config.THRESHOLDS
-        self.buffer_threshold = Config.BUFFER_THRESHOLD
+        self.buffer_threshold = SCORING.buffer_threshold
+        self.top_k = Config.SCORER_TOP_K
+        # Array-indexed thresholds avoid per-candidate dict lookups
+        self._type_index = Config.MEMORY_TYPE_INDEX
+        self._threshold_array = Config.THRESHOLD_ARRAY
+        # Weight vector for the vectorized salience blend
+        self._weight_vector = np.array([
+            SCORING.relevance_w,
+            SCORING.specificity_w,
+            SCORING.confidence_w,
+        ], dtype=np.float32)
+        # Threshold array extended with the 0.7 default in the last slot
+        # so the fused numba path can index unknown types safely
+        self._kernel_thresholds = np.append(self._threshold_array, np.float32(0.7))
+        self._default_type_index = len(self._threshold_array)
+        # Enum-keyed thresholds: one hash of the (cached) enum member
+        # replaces the .value access plus index chase per candidate.
+        # Built from the original config floats, not the float32 array,
+        # so reason strings render "0.6" rather than its float32 repr
+        self._threshold_by_type = {
+            mt: self.thresholds[mt.value]
+            for mt in MemoryType
+        }
+        # Reason templates with type names and threshold reprs baked in
+        # at startup; per-candidate formatting only fills in the score
+        self._keep_reasons = {
+            mt: f"Score {{:.3f}} meets {mt.value} threshold {self._threshold_by_type[mt]}"
+            for mt in MemoryType
+        }
+        self._buffer_reasons = {
+            mt: (f"Score {{:.3f}} below {mt.value} threshold {self._threshold_by_type[mt]}"
+                 f" but above buffer threshold {self.buffer_threshold}")
+            for mt in MemoryType
+        }
+        self._reject_reason = f"Score {{:.3f}} below buffer threshold {self.buffer_threshold}"
     
     def score_memories(self, candidates: List[CandidateMemory]) -> List[Tuple[CandidateMemory, float]]:
-        """Score all candidate memories"""
-        scored = []
-        for candidate in candidates:
-            score = self._calculate_salience_score(candidate)
-            candidate.salience_score = score
-            scored.append((candidate, score))
+        """Score all candidate memories with one vectorized weighted sum"""
+        if not candidates:
+            return []
+        
+        # fromiter fills the feature matrix without materializing the
+        # intermediate list-of-lists first
+        n = len(candidates)
+        features = np.fromiter(
+            (value for c in candidates for value in (c.relevance, c.specificity, c.confidence)),
+            dtype=np.float32,
+            count=3 * n,
+        ).reshape(n, 3)
+        scores = np.round(features @ self._weight_vector, 3)
+        
+        for candidate, score in zip(candidates, scores):
+            candidate.salience_score = float(score)
         
-        # Sort by score descending
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return scored
+        # Sort by score descending; with a configured top-K only the K
+        # highest rows pay the sort and the tail follows in partition
+        # order. Every candidate is returned either way, so downstream
+        # decisions and response counts always cover the full batch
+        if 0 < self.top_k < n:
+            partitioned = np.argpartition(-scores, self.top_k - 1)
+            head = partitioned[:self.top_k]
+            order = np.concatenate(
+                (head[np.argsort(-scores[head], kind="stable")], partitioned[self.top_k:])
+            )
+        else:
+            order = np.argsort(-scores, kind="stable")
+        return [(candidates[i], float(scores[i])) for i in order]
     
     def _calculate_salience_score(self, candidate: CandidateMemory) -> float:
         """Calculate salience score using linear blend of factors"""
         score = (
-            self.weights["relevance"] * candidate.relevance +
-            self.weights["specificity"] * candidate.specificity +
-            self.weights["confidence"] * candidate.confidence
+            SCORING.relevance_w * candidate.relevance +
+            SCORING.specificity_w * candidate.specificity +
+            SCORING.confidence_w * candidate.confidence
         )
         return round(score, 3)
     
     def make_decisions(self, scored_candidates: List[Tuple[CandidateMemory, float]]) -> List[MemoryDecision]:
         """Make decisions about each candidate based on scores and thresholds"""
+        if _score_and_classify is not None and scored_candidates:
+            return self._make_decisions_fused(scored_candidates)
+        
         decisions = []
+        log_enabled = logger.isEnabledFor(logging.INFO)
+        rows = []
         
         for candidate, score in scored_candidates:
             decision = self._evaluate_candidate(candidate, score)
             decisions.append(decision)
-            
-            logger.info(f"Memory '{candidate.content[:50]}...' scored {score:.3f}, decision: {decision.action}")
+            if log_enabled:
+                rows.append(f"'{candidate.content[:50]}...' {score:.3f} -> {decision.action}")
+        
+        if rows:
+            logger.info("Scored %d candidates: %s", len(rows), "; ".join(rows))
+        
+        return decisions
+    
+    def _make_decisions_fused(self, scored_candidates: List[Tuple[CandidateMemory, float]]) -> List[MemoryDecision]:
+        """Classify the whole batch in one JIT-compiled pass"""
+        n = len(scored_candidates)
+        features = np.fromiter(
+            (value for candidate, _ in scored_candidates
+             for value in (candidate.relevance, candidate.specificity, candidate.confidence)),
+            dtype=np.float32,
+            count=3 * n,
+        ).reshape(n, 3)
+        type_ids = np.fromiter(
+            (self._type_index.get(candidate.memory_type.value, self._default_type_index)
+             for candidate, _ in scored_candidates),
+            dtype=np.int64,
+            count=n,
+        )
+        _, actions = _score_and_classify(
+            features, type_ids, self._weight_vector,
+            self._kernel_thresholds, self.buffer_threshold
+        )
+        
+        decisions = []
+        log_enabled = logger.isEnabledFor(logging.INFO)
+        rows = []
+        for (candidate, score), action_code in zip(scored_candidates, actions):
+            if action_code == 0:
+                decision = MemoryDecision(
+                    action="keep",
+                    reason=self._keep_reasons[candidate.memory_type].format(score)
+                )
+            elif action_code == 1:
+                decision = MemoryDecision(
+                    action="buffer",
+                    reason=self._buffer_reasons[candidate.memory_type].format(score)
+                )
+            else:
+                decision = MemoryDecision(
+                    action="reject",
+                    reason=self._reject_reason.format(score)
+                )
+            decisions.append(decision)
+            if log_enabled:
+                rows.append(f"'{candidate.content[:50]}...' {score:.3f} -> {decision.action}")
+        
+        if rows:
+            logger.info("Scored %d candidates: %s", len(rows), "; ".join(rows))
         
         return decisions
     
     def _evaluate_candidate(self, candidate: CandidateMemory, score: float) -> MemoryDecision:
         """Evaluate a single candidate and make a decision"""
-        memory_type = candidate.memory_type.value
-        threshold = self.thresholds.get(memory_type, 0.7)
+        threshold = self._threshold_by_type.get(candidate.memory_type, 0.7)
         
         if score >= threshold:
             return MemoryDecision(
                 action="keep",
-                reason=f"Score {score:.3f} meets {memory_type} threshold {threshold}"
+                reason=self._keep_reasons[candidate.memory_type].format(score)
             )
         elif score >= self.buffer_threshold:
             return MemoryDecision(
                 action="buffer",
-                reason=f"Score {score:.3f} below {memory_type} threshold {threshold} but above buffer threshold {self.buffer_threshold}"
+                reason=self._buffer_reasons[candidate.memory_type].format(score)
             )
         else:
             return MemoryDecision(
                 action="reject",
-                reason=f"Score {score:.3f} below buffer threshold {self.buffer_threshold}"
+                reason=self._reject_reason.format(score)
             )
     
     def get_statistics(self, decisions: List[MemoryDecision]) -> dict:
         """Get statistics about the decisions made"""
-        stats = {
+        # One Counter pass replaces a filtering scan per action
+        counts = Counter(d.action for d in decisions)
+        return {
             "total": len(decisions),
-            "kept": len([d for d in decisions if d.action == "keep"]),
-            "buffered": len([d for d in decisions if d.action == "buffer"]),
-            "rejected": len([d for d in decisions if d.action == "reject"]),
-            "merged": len([d for d in decisions if d.action == "merge"])
+            "kept": counts.get("keep", 0),
+            "buffered": counts.get("buffer", 0),
+            "rejected": counts.get("reject", 0),
+            "merged": counts.get("merge", 0)
         }
-        return stats
 
 
 
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Numba is optional: when present, salience scoring and threshold
+# classification fuse into one JIT-compiled pass over the batch; when
+# absent the scorer keeps its Python decision loop
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+# Action codes returned by the kernel
+ACTION_KEEP = 0
+ACTION_BUFFER = 1
+ACTION_REJECT = 2
+
+if _NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _score_and_classify_kernel(feats, type_ids, weights, thresholds, buffer_threshold, scores, actions):
+        for i in range(feats.shape[0]):
+            s = (
+                feats[i, 0] * weights[0]
+                + feats[i, 1] * weights[1]
+                + feats[i, 2] * weights[2]
+            )
+            # Match the rounding applied by score_memories so both paths
+            # compare identical values against the thresholds
+            s = round(s * 1000.0) / 1000.0
+            scores[i] = s
+            if s >= thresholds[type_ids[i]]:
+                actions[i] = ACTION_KEEP
+            elif s >= buffer_threshold:
+                actions[i] = ACTION_BUFFER
+            else:
+                actions[i] = ACTION_REJECT
+
+    def score_and_classify(feats, type_ids, weights, thresholds, buffer_threshold):
+        """Fused salience scoring and classification over a candidate batch
+
+        feats is an (N, 3) float32 feature matrix, type_ids indexes into
+        thresholds per candidate; returns (scores, action codes).
+        """
+        scores = np.empty(feats.shape[0], dtype=np.float32)
+        actions = np.empty(feats.shape[0], dtype=np.int8)
+        _score_and_classify_kernel(
+            feats, type_ids, weights, thresholds,
+            np.float32(buffer_threshold), scores, actions
+        )
+        return scores, actions
+
+    # Warm the JIT at import so the first request doesn't pay compile time
+    score_and_classify(
+        np.zeros((1, 3), dtype=np.float32),
+        np.zeros(1, dtype=np.int64),
+        np.zeros(3, dtype=np.float32),
+        np.zeros(1, dtype=np.float32),
+        0.0,
+    )
+else:
+    score_and_classify = None
@@ -1,6 +1,16 @@
+import atexit
+import hashlib
+from functools import lru_cache
+import queue
+import threading
+import numpy as np
+from numpy.random import Generator, PCG64
+from bson import Binary, ObjectId
 from pymongo import MongoClient
-from typing import List, Optional, Dict, Any
-from models import StoredMemory, BufferedMemory, CandidateMemory, MemoryDecision
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
+from typing import List, Optional, Dict, Any, Tuple
+from models import StoredMemory, BufferedMemory, CandidateMemory, MemoryDecision, MemoryType, DedupEntry
 from config import Config
 import logging
 from datetime import datetime, timezone
@@ -8,11 +18,53 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# One client per process: MongoClient is thread-safe and pools
+# internally, so every MemoryStorage instance shares it instead of
+# opening its own connection set
+_client: Optional[MongoClient] = None
+_indexes_created = False
+
+# Identifies how stored embeddings were produced. Vectors from different
+# schemes are not comparable (the pre-versioning md5/np.random scheme
+# yields ~0.75 cosine even for identical text), so dedup must never mix
+# them; bump this whenever the generation changes.
+_EMBEDDING_SCHEME = "blake2s-pcg64-v1"
+
+@lru_cache(maxsize=Config.EMBED_CACHE_SIZE)
+def _embedding_bytes_for_seed(seed: int) -> bytes:
+    """Placeholder embedding bytes for a content seed, cached by seed
+    
+    The approval flow re-embeds content that was already embedded when
+    it was buffered, and conversational workloads repeat verbatim text;
+    keying on the 8-byte content digest bounds the cache while letting
+    repeats skip the 1536-float draw. Once a real embeddings API lands
+    this cache fronts paid calls with the same key.
+    """
+    return Generator(PCG64(seed)).random(1536, dtype=np.float32).tobytes()
+
+def _get_client() -> MongoClient:
+    """Get the process-wide pooled MongoClient, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = MongoClient(
+            Config.MONGODB_URI,
+            maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=Config.MONGODB_MIN_POOL_SIZE,
+            socketTimeoutMS=Config.MONGODB_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=Config.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            compressors="zstd",
+            retryWrites=True,
+        )
+    return _client
+
 class MemoryStorage:
     """MongoDB storage for memories and audit logs"""
     
     def __init__(self):
-        self.client = MongoClient(Config.MONGODB_URI)
+        # The pool is sized for the FastAPI threadpool so concurrent
+        # requests reuse warm connections instead of paying DNS/TLS
+        # setup per call
+        self.client = _get_client()
         self.db = self.client[Config.MONGODB_DB]
         
         # Collections
@@ -20,8 +72,27 @@ class MemoryStorage:
         self.buffered_memories = self.db.buffered_memories
         self.audit_logs = self.db.audit_logs
         
-        # Create indexes
-        self._create_indexes()
+        # Audit entries and Tavus upserts are non-critical: a bounded
+        # queue drained by a daemon thread takes them off the request
+        # path entirely, with audit writes batched through the
+        # unacknowledged handle
+        self._audit_flush_size = Config.AUDIT_FLUSH_SIZE
+        self._audit_logs_fast = self.db.get_collection(
+            "audit_logs", write_concern=WriteConcern(w=0)
+        )
+        self._bg_queue: queue.Queue = queue.Queue(maxsize=10_000)
+        self._bg_thread = threading.Thread(
+            target=self._drain_background, name="storage-bg", daemon=True
+        )
+        self._bg_thread.start()
+        atexit.register(self.flush)
+        
+        # Create indexes once per process; they are idempotent on the
+        # server but each call still costs a round-trip
+        global _indexes_created
+        if not _indexes_created:
+            self._create_indexes()
+            _indexes_created = True
     
     def _create_indexes(self):
         """Create database indexes for performance"""
@@ -34,6 +105,10 @@ class MemoryStorage:
             self.buffered_memories.create_index([("buffer_score", -1)])
             self.buffered_memories.create_index([("buffered_at", -1)])
             
+            # Compound indexes backing keyset pagination on list views
+            self.buffered_memories.create_index([("buffered_at", -1), ("_id", -1)])
+            self.stored_memories.create_index([("stored_at", -1), ("_id", -1)])
+            
             # Index on audit logs for traceability
             self.audit_logs.create_index([("timestamp", -1)])
             self.audit_logs.create_index([("memory_id", 1)])
@@ -55,11 +130,7 @@ class MemoryStorage:
                 embedding=embedding
             )
             
-            # Convert to dict for MongoDB
-            memory_dict = stored_memory.dict()
-            memory_dict["_id"] = None  # Let MongoDB generate ID
-            
-            result = self.stored_memories.insert_one(memory_dict)
+            result = self.stored_memories.insert_one(self._stored_memory_doc(stored_memory))
             memory_id = str(result.inserted_id)
             
             # Update the stored memory with the ID
@@ -68,8 +139,8 @@ class MemoryStorage:
             # Log the storage action
             self._log_audit("store", memory_id, decision, candidate)
             
-            # Stub call to Tavus
-            self._upsert_tavus_memory(stored_memory)
+            # Tavus upsert happens on the background writer thread
+            self._enqueue_background("tavus", stored_memory)
             
             logger.info(f"Stored memory with ID: {memory_id}")
             return memory_id
@@ -92,7 +163,7 @@ class MemoryStorage:
             )
             
             # Convert to dict for MongoDB
-            memory_dict = buffered_memory.dict()
+            memory_dict = buffered_memory.model_dump()
             
             # Insert into MongoDB
             result = self.buffered_memories.insert_one(memory_dict)
@@ -108,10 +179,95 @@ class MemoryStorage:
             logger.error(f"Failed to buffer memory: {e}")
             raise
     
+    def store_memories_bulk(self, items: List[Tuple[CandidateMemory, MemoryDecision, str]]) -> List[str]:
+        """Store a batch of accepted memories with a single insert_many"""
+        if not items:
+            return []
+        try:
+            stored = []
+            docs = []
+            for candidate, decision, final_content in items:
+                stored_memory = StoredMemory(
+                    candidate=candidate,
+                    decision=decision,
+                    final_content=final_content,
+                    embedding=self._generate_embedding(final_content)
+                )
+                stored.append(stored_memory)
+                docs.append(self._stored_memory_doc(stored_memory))
+            
+            result = self.stored_memories.insert_many(docs, ordered=False)
+            memory_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+            
+            for stored_memory, memory_id, (candidate, decision, _) in zip(stored, memory_ids, items):
+                stored_memory.id = memory_id
+                self._log_audit("store", memory_id, decision, candidate)
+                self._enqueue_background("tavus", stored_memory)
+            
+            logger.info(f"Stored {len(memory_ids)} memories in one bulk insert")
+            return memory_ids
+            
+        except Exception as e:
+            logger.error(f"Failed to bulk store memories: {e}")
+            raise
+    
+    def buffer_memories_bulk(self, items: List[Tuple[CandidateMemory, str, float]]) -> List[str]:
+        """Buffer a batch of memories for admin review with a single insert_many"""
+        if not items:
+            return []
+        try:
+            docs = [
+                BufferedMemory(
+                    candidate=candidate,
+                    buffer_reason=buffer_reason,
+                    buffer_score=buffer_score,
+                    buffered_at=datetime.now(timezone.utc)
+                ).model_dump()
+                for candidate, buffer_reason, buffer_score in items
+            ]
+            
+            result = self.buffered_memories.insert_many(docs, ordered=False)
+            memory_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+            
+            for memory_id, (candidate, _, _) in zip(memory_ids, items):
+                self._log_audit("buffer", memory_id, None, candidate)
+            
+            logger.info(f"Buffered {len(memory_ids)} memories in one bulk insert")
+            return memory_ids
+            
+        except Exception as e:
+            logger.error(f"Failed to bulk buffer memories: {e}")
+            raise
+    
+    def _stored_memory_doc(self, stored_memory: StoredMemory) -> Dict[str, Any]:
+        """Hand-built insert payload for a stored memory
+        
+        The outer fields are assembled directly instead of running
+        pydantic's generic serializer over the whole model, and the
+        embedding is written as packed float32 bytes - a quarter of the
+        BSON size of a list of doubles. The model validators decode the
+        bytes back on read.
+        """
+        embedding = stored_memory.embedding
+        return {
+            "candidate": stored_memory.candidate.model_dump(),
+            "decision": stored_memory.decision.model_dump(),
+            "final_content": stored_memory.final_content,
+            "embedding": Binary(embedding.tobytes()) if embedding is not None else None,
+            "embedding_scheme": _EMBEDDING_SCHEME,
+            "stored_at": stored_memory.stored_at,
+        }
+    
     def get_stored_memories(self, limit: int = 100, offset: int = 0) -> List[StoredMemory]:
         """Retrieve stored memories with pagination"""
         try:
-            cursor = self.stored_memories.find().skip(offset).limit(limit).sort("stored_at", -1)
+            # The list view never renders embeddings, and the 1536-float
+            # vector dominates each document's size on the wire
+            cursor = (
+                self.stored_memories
+                .find({}, projection={"embedding": 0})
+                .skip(offset).limit(limit).sort("stored_at", -1)
+            )
             memories = []
             
             for doc in cursor:
@@ -125,10 +281,58 @@ class MemoryStorage:
             logger.error(f"Failed to retrieve stored memories: {e}")
             return []
     
-    def get_buffered_memories(self, limit: int = 100, offset: int = 0) -> List[BufferedMemory]:
-        """Retrieve buffered memories for admin review"""
+    def get_dedup_corpus(self, limit: int = 1000) -> List[DedupEntry]:
+        """Retrieve only the fields the deduper needs, most recent first"""
         try:
-            cursor = self.buffered_memories.find().skip(offset).limit(limit).sort("buffered_at", -1)
+            cursor = (
+                self.stored_memories
+                .find({}, projection={"final_content": 1, "embedding": 1, "embedding_scheme": 1})
+                .sort("stored_at", -1)
+                .limit(limit)
+            )
+            entries = []
+            for doc in cursor:
+                embedding = doc.get("embedding")
+                if embedding is not None and doc.get("embedding_scheme") != _EMBEDDING_SCHEME:
+                    # Written under a different (or pre-versioning)
+                    # scheme; the placeholder derives purely from the
+                    # content, so regenerating is an exact backfill and
+                    # keeps cross-scheme vectors out of the cosine path
+                    embedding = self._generate_embedding(doc.get("final_content", ""))
+                entries.append(DedupEntry(
+                    id=str(doc["_id"]),
+                    final_content=doc.get("final_content", ""),
+                    embedding=embedding
+                ))
+            return entries
+            
+        except Exception as e:
+            logger.error(f"Failed to retrieve dedup corpus: {e}")
+            return []
+    
+    def get_buffered_memories(self, limit: int = 100, offset: int = 0,
+                              after: Optional[Tuple[datetime, str]] = None) -> List[BufferedMemory]:
+        """Retrieve buffered memories for admin review
+        
+        With an `after` cursor of (buffered_at, id) from the last row of
+        the previous page, pagination is keyset-based: the compound index
+        seeks straight to the page instead of skipping offset documents.
+        """
+        try:
+            query = {}
+            if after is not None:
+                after_ts, after_id = after
+                query = {"$or": [
+                    {"buffered_at": {"$lt": after_ts}},
+                    {"buffered_at": after_ts, "_id": {"$lt": ObjectId(after_id)}},
+                ]}
+            cursor = (
+                self.buffered_memories.find(query)
+                .sort([("buffered_at", -1), ("_id", -1)])
+                .limit(limit)
+            )
+            if after is None and offset:
+                cursor = cursor.skip(offset)
             memories = []
             
             for doc in cursor:
@@ -142,15 +346,23 @@ class MemoryStorage:
             logger.error(f"Failed to retrieve buffered memories: {e}")
             return []
     
+    @staticmethod
+    def _parse_object_id(memory_id: str) -> Optional[ObjectId]:
+        """Parse a string memory ID, or None if it is not a valid ObjectId
+        
+        is_valid is a plain length/hex check, so malformed IDs on the
+        happy path cost no exception raise and traceback.
+        """
+        if not ObjectId.is_valid(memory_id):
+            logger.error(f"Invalid memory ID format: {memory_id}")
+            return None
+        return ObjectId(memory_id)
+    
     def approve_buffered_memory(self, memory_id: str, admin_notes: str = None) -> bool:
         """Approve a buffered memory and move it to storage"""
         try:
-            # Convert string ID to ObjectId for MongoDB query
-            from bson import ObjectId
-            try:
-                object_id = ObjectId(memory_id)
-            except Exception as e:
-                logger.error(f"Invalid memory ID format: {memory_id}, error: {e}")
+            object_id = self._parse_object_id(memory_id)
+            if object_id is None:
                 return False
             
             # Get the buffered memory
@@ -170,18 +382,44 @@ class MemoryStorage:
                 admin_notes=admin_notes
             )
             
-            # Store the memory
+            stored_memory = StoredMemory(
+                candidate=candidate,
+                decision=decision,
+                final_content=candidate.content,
+                embedding=self._generate_embedding(candidate.content)
+            )
+            doc = self._stored_memory_doc(stored_memory)
+            
+            # Insert and delete atomically in one session so an approval
+            # can never both store the memory and leave it in the buffer
             try:
-                memory_id = self.store_memory(candidate, decision, candidate.content)
-                logger.info(f"Successfully stored approved memory: {memory_id}")
+                try:
+                    with self.client.start_session() as session:
+                        with session.start_transaction():
+                            result = self.stored_memories.insert_one(doc, session=session)
+                            self.buffered_memories.delete_one({"_id": object_id}, session=session)
+                except OperationFailure as txn_error:
+                    # Fall back only when the deployment doesn't support
+                    # transactions (standalone servers report
+                    # IllegalOperation, code 20). Anything else -
+                    # including commit-uncertain failures - propagates,
+                    # since re-running both writes could store the
+                    # memory twice.
+                    if txn_error.code != 20 and "Transaction numbers" not in str(txn_error):
+                        raise
+                    result = self.stored_memories.insert_one(doc)
+                    self.buffered_memories.delete_one({"_id": object_id})
                 
-                # Remove from buffered collection
-                self.buffered_memories.delete_one({"_id": object_id})
-                logger.info(f"Removed buffered memory: {memory_id}")
+                memory_id = str(result.inserted_id)
+                stored_memory.id = memory_id
                 
-                # Log the approval action
+                # Audit entries go through the buffered w=0 path and the
+                # Tavus stub is external, so both stay outside the session
+                self._log_audit("store", memory_id, decision, candidate)
+                self._enqueue_background("tavus", stored_memory)
                 self._log_audit("approve", memory_id, decision, candidate)
                 
+                logger.info(f"Approved buffered memory into storage: {memory_id}")
                 return True
                 
             except Exception as store_error:
@@ -195,12 +433,8 @@ class MemoryStorage:
     def reject_buffered_memory(self, memory_id: str, admin_notes: str = None) -> bool:
         """Reject a buffered memory"""
         try:
-            # Convert string ID to ObjectId for MongoDB query
-            from bson import ObjectId
-            try:
-                object_id = ObjectId(memory_id)
-            except Exception as e:
-                logger.error(f"Invalid memory ID format: {memory_id}, error: {e}")
+            object_id = self._parse_object_id(memory_id)
+            if object_id is None:
                 return False
             
             # Get the buffered memory
@@ -209,10 +443,13 @@ class MemoryStorage:
                 logger.warning(f"Buffered memory {memory_id} not found")
                 return False
             
-            # Convert to BufferedMemory object
-            buffered_doc["id"] = str(buffered_doc["_id"])
-            del buffered_doc["_id"]
-            buffered_memory = BufferedMemory(**buffered_doc)
+            # Only the candidate is needed for the audit entry, and the
+            # document comes from our own collection, so model_construct
+            # skips re-validating the whole BufferedMemory; the enum is
+            # rehydrated from its stored string value
+            candidate_data = buffered_doc["candidate"]
+            candidate_data["memory_type"] = MemoryType(candidate_data["memory_type"])
+            candidate = CandidateMemory.model_construct(**candidate_data)
             
             # Create decision for rejection
             decision = MemoryDecision(
@@ -222,7 +459,7 @@ class MemoryStorage:
             )
             
             # Log the rejection
-            self._log_audit("reject", memory_id, decision, buffered_memory.candidate)
+            self._log_audit("reject", memory_id, decision, candidate)
             
             # Remove from buffer
             self.buffered_memories.delete_one({"_id": object_id})
@@ -244,24 +481,83 @@ class MemoryStorage:
                 "memory_type": candidate.memory_type.value,
                 "content": candidate.content,
                 "salience_score": candidate.salience_score,
-                "decision": decision.dict() if decision else None,
+                "decision": decision.model_dump() if decision else None,
                 "evidence": candidate.extraction_evidence
             }
             
-            self.audit_logs.insert_one(audit_log)
+            self._enqueue_background("audit", audit_log)
             
         except Exception as e:
             logger.warning(f"Failed to log audit event: {e}")
     
-    def _generate_embedding(self, text: str) -> List[float]:
+    def _enqueue_background(self, kind: str, payload) -> None:
+        """Hand work to the background writer without blocking the caller"""
+        try:
+            self._bg_queue.put_nowait((kind, payload))
+        except queue.Full:
+            logger.warning(f"Background queue full; dropping {kind} entry")
+    
+    def _drain_background(self):
+        """Drain the background queue, batching audit writes
+        
+        Runs on the daemon writer thread for the life of the process.
+        Each cycle folds whatever is already queued into one audit
+        insert_many, so bursts collapse into a single round-trip.
+        """
+        while True:
+            item = self._bg_queue.get()
+            pulled = 1
+            try:
+                audit_batch = []
+                tavus_batch = []
+                kind, payload = item
+                (audit_batch if kind == "audit" else tavus_batch).append(payload)
+                while len(audit_batch) < self._audit_flush_size:
+                    try:
+                        kind, payload = self._bg_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    pulled += 1
+                    (audit_batch if kind == "audit" else tavus_batch).append(payload)
+                
+                if audit_batch:
+                    try:
+                        self._audit_logs_fast.insert_many(audit_batch, ordered=False)
+                    except Exception as e:
+                        logger.warning(f"Failed to flush {len(audit_batch)} audit entries: {e}")
+                for stored_memory in tavus_batch:
+                    try:
+                        self._upsert_tavus_memory(stored_memory)
+                    except Exception as e:
+                        logger.warning(f"Tavus upsert failed: {e}")
+            finally:
+                for _ in range(pulled):
+                    self._bg_queue.task_done()
+    
+    def flush(self):
+        """Block until all queued audit and Tavus work has been processed"""
+        self._bg_queue.join()
+    
+    def _generate_embedding(self, text: str):
         """Generate embedding for text (placeholder)"""
-        # In production, this would call OpenAI's embedding API
-        # For now, return a placeholder
-        import hashlib
-        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
-        import numpy as np
-        np.random.seed(seed)
-        return np.random.rand(1536).tolist()
+        # In production, this would call OpenAI's embedding API.
+        # A local PCG64 generator keeps this deterministic per text
+        # without touching numpy's thread-shared global RNG state, and
+        # fills float32 directly instead of float64-then-convert.
+        # Caching bytes rather than an array keeps cache hits immutable;
+        # frombuffer is a zero-copy read-only view over them
+        seed = int.from_bytes(hashlib.blake2s(text.encode(), digest_size=8).digest(), "little")
+        return np.frombuffer(_embedding_bytes_for_seed(seed), dtype=np.float32)
+    
+    def generate_embeddings_batch(self, texts: List[str]):
+        """Generate embeddings for a batch of texts in one call
+        
+        In production this would be a single request to OpenAI's
+        embeddings endpoint with input=texts, amortizing the round-trip
+        across the batch; the placeholder stacks the per-text generator
+        into one float32 matrix.
+        """
+        return np.stack([self._generate_embedding(text) for text in texts])
     
     def _upsert_tavus_memory(self, stored_memory: StoredMemory):
         """Stub for Tavus memory integration"""
@@ -281,10 +577,12 @@ class MemoryStorage:
             # Test database connection
             self.db.command("ping")
             
-            # Get collection counts
-            stored_count = self.stored_memories.count_documents({})
-            buffered_count = self.buffered_memories.count_documents({})
-            audit_count = self.audit_logs.count_documents({})
+            # estimated_document_count reads collection metadata instead
+            # of scanning; three sequential metadata reads are cheap
+            # enough that a per-call thread pool isn't worth its setup
+            stored_count = self.stored_memories.estimated_document_count()
+            buffered_count = self.buffered_memories.estimated_document_count()
+            audit_count = self.audit_logs.estimated_document_count()
             
             return {
                 "status": "healthy",
@@ -304,8 +602,8 @@ class MemoryStorage:
             }
     
     def close(self):
-        """Close database connection"""
-        self.client.close()
+        """Flush pending background work; the shared client stays open"""
+        self.flush()
 
 
 